@@ -0,0 +1,26 @@
+-- Replace the full prompt/response columns of pdf_library.extraction_logs
+-- with a prompt hash, token counts and a response preview. Existing rows are
+-- backfilled from the old columns before they are dropped; failed rows keep
+-- their full response in response_full.
+
+BEGIN;
+
+ALTER TABLE pdf_library.extraction_logs
+    ADD COLUMN IF NOT EXISTS prompt_hash text,
+    ADD COLUMN IF NOT EXISTS prompt_tokens integer,
+    ADD COLUMN IF NOT EXISTS completion_tokens integer,
+    ADD COLUMN IF NOT EXISTS response_preview text,
+    ADD COLUMN IF NOT EXISTS response_len integer,
+    ADD COLUMN IF NOT EXISTS response_full text;
+
+UPDATE pdf_library.extraction_logs
+SET prompt_hash = encode(sha256(convert_to(prompt, 'UTF8')), 'hex'),
+    response_preview = left(response, 512),
+    response_len = length(response),
+    response_full = CASE WHEN error_message IS NOT NULL THEN response END;
+
+ALTER TABLE pdf_library.extraction_logs
+    DROP COLUMN prompt,
+    DROP COLUMN response;
+
+COMMIT;
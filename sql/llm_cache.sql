@@ -0,0 +1,7 @@
+-- Exact-match cache of AI extraction responses (see MetadataExtractor._cache_key).
+
+CREATE TABLE IF NOT EXISTS pdf_library.llm_cache (
+    key text PRIMARY KEY,
+    response text NOT NULL,
+    created_at timestamp NOT NULL DEFAULT now()
+);
@@ -0,0 +1,16 @@
+-- Semantic cache of AI extraction responses keyed by input embedding
+-- (see MetadataExtractor._semcache_get). Requires pgvector.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS pdf_library.llm_semcache (
+    id serial PRIMARY KEY,
+    template_key text NOT NULL,
+    embedding vector(1536) NOT NULL,
+    response jsonb NOT NULL,
+    created_at timestamp NOT NULL DEFAULT now()
+);
+
+-- Approximate nearest-neighbour index for ORDER BY embedding <=> ... LIMIT 1
+CREATE INDEX IF NOT EXISTS llm_semcache_embedding_idx
+    ON pdf_library.llm_semcache USING hnsw (embedding vector_cosine_ops);
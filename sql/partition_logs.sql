@@ -0,0 +1,111 @@
+-- Convert pdf_library.download_logs and pdf_library.extraction_logs into
+-- tables range-partitioned by month on "timestamp", with BRIN indexes.
+--
+-- Run after extraction_logs_trim.sql. Existing rows are copied over and
+-- the previous tables are kept as *_old; drop them once the copy has been
+-- checked. Run pdf_library.create_log_partitions() periodically (e.g.
+-- monthly) so partitions always exist ahead of the current date.
+
+BEGIN;
+
+-- Creates any missing monthly partitions between from_date and to_date.
+-- Rows that already landed in the DEFAULT partition for such a month are
+-- moved into the new partition before it is attached; otherwise attaching
+-- would violate the default partition's constraint.
+CREATE OR REPLACE FUNCTION pdf_library.create_log_partitions(from_date date, to_date date)
+RETURNS void LANGUAGE plpgsql AS $$
+DECLARE
+    m date := date_trunc('month', from_date);
+    m_end date;
+    tbl text;
+    part text;
+BEGIN
+    WHILE m <= to_date LOOP
+        m_end := (m + interval '1 month')::date;
+        FOREACH tbl IN ARRAY ARRAY['download_logs', 'extraction_logs'] LOOP
+            part := tbl || '_' || to_char(m, 'YYYYMM');
+            CONTINUE WHEN to_regclass(format('pdf_library.%I', part)) IS NOT NULL;
+
+            EXECUTE format(
+                'CREATE TABLE pdf_library.%I (LIKE pdf_library.%I INCLUDING DEFAULTS)',
+                part, tbl
+            );
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM pdf_library.%I WHERE "timestamp" >= %L AND "timestamp" < %L RETURNING *) '
+                'INSERT INTO pdf_library.%I SELECT * FROM moved',
+                tbl || '_default', m, m_end, part
+            );
+            EXECUTE format(
+                'ALTER TABLE pdf_library.%I ATTACH PARTITION pdf_library.%I FOR VALUES FROM (%L) TO (%L)',
+                tbl, part, m, m_end
+            );
+        END LOOP;
+        m := m_end;
+    END LOOP;
+END $$;
+
+ALTER TABLE pdf_library.download_logs RENAME TO download_logs_old;
+ALTER TABLE pdf_library.extraction_logs RENAME TO extraction_logs_old;
+
+-- No primary key: on a partitioned table it would have to include
+-- "timestamp" and add a btree index to every insert.
+CREATE TABLE pdf_library.download_logs (
+    id serial,
+    url text,
+    local_path text,
+    status text,
+    error_message text,
+    duration_sec double precision,
+    "timestamp" timestamp NOT NULL DEFAULT now()
+) PARTITION BY RANGE ("timestamp");
+
+CREATE TABLE pdf_library.extraction_logs (
+    id serial,
+    sys_prompt text,
+    prompt_hash text,
+    prompt_tokens integer,
+    completion_tokens integer,
+    response_preview text,
+    response_len integer,
+    response_full text,
+    status text,
+    error_message text,
+    duration_sec double precision,
+    "timestamp" timestamp NOT NULL DEFAULT now()
+) PARTITION BY RANGE ("timestamp");
+
+-- Catch-all partitions so a missed create_log_partitions() run never drops
+-- logs; the next run moves those rows into their monthly partition
+CREATE TABLE pdf_library.download_logs_default PARTITION OF pdf_library.download_logs DEFAULT;
+CREATE TABLE pdf_library.extraction_logs_default PARTITION OF pdf_library.extraction_logs DEFAULT;
+
+SELECT pdf_library.create_log_partitions(
+    LEAST(
+        (SELECT min("timestamp"::timestamp) FROM pdf_library.download_logs_old),
+        (SELECT min("timestamp"::timestamp) FROM pdf_library.extraction_logs_old),
+        now()
+    )::date,
+    (now() + interval '12 months')::date
+);
+
+CREATE INDEX ON pdf_library.download_logs USING brin ("timestamp");
+CREATE INDEX ON pdf_library.extraction_logs USING brin ("timestamp");
+
+INSERT INTO pdf_library.download_logs
+    (id, url, local_path, status, error_message, duration_sec, "timestamp")
+SELECT id, url, local_path, status, error_message, duration_sec, "timestamp"::timestamp
+FROM pdf_library.download_logs_old;
+
+INSERT INTO pdf_library.extraction_logs
+    (id, sys_prompt, prompt_hash, prompt_tokens, completion_tokens, response_preview,
+     response_len, response_full, status, error_message, duration_sec, "timestamp")
+SELECT id, sys_prompt, prompt_hash, prompt_tokens, completion_tokens, response_preview,
+       response_len, response_full, status, error_message, duration_sec, "timestamp"::timestamp
+FROM pdf_library.extraction_logs_old;
+
+SELECT setval(pg_get_serial_sequence('pdf_library.download_logs', 'id'),
+              COALESCE((SELECT max(id) FROM pdf_library.download_logs), 0) + 1, false);
+SELECT setval(pg_get_serial_sequence('pdf_library.extraction_logs', 'id'),
+              COALESCE((SELECT max(id) FROM pdf_library.extraction_logs), 0) + 1, false);
+
+COMMIT;
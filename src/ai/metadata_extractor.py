@@ -1,9 +1,13 @@
 import os
+import re
 import json
+import hashlib
+import orjson
 import logging
-from typing import Dict, Optional
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
 from openai import OpenAI, OpenAIError
-from database.postgres_client import PostgresClient
+from database.postgres_client import PostgresClient, log_buffer
 import datetime
 import time
 from dotenv import load_dotenv
@@ -13,6 +17,11 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Markdown code fence (``` or ```json) wrapped around the whole response
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*\n?(.*?)\n?```\s*$", re.DOTALL)
+# Unpaired opening or closing fence, e.g. a response cut off before the closing one
+_LONE_FENCE_RE = re.compile(r"^\s*```(?:json)?|```\s*$")
+
 class MetadataExtractor:
     def __init__(
         self,
@@ -21,6 +30,10 @@ class MetadataExtractor:
         max_tokens: int = 300,
         temperature: float = 0.0,
         requests_per_minute: int = 60,
+        use_cache: bool = True,
+        semantic_cache: bool = False,
+        semantic_threshold: float = 0.95,
+        embedding_model: str = "text-embedding-3-small",
     ):
         """
         Initialize the metadata extractor.
@@ -31,6 +44,10 @@ class MetadataExtractor:
             max_tokens: Max tokens in response
             temperature: Sampling temperature
             requests_per_minute: Rate limit for API calls
+            use_cache: Reuse stored responses for identical requests
+            semantic_cache: Reuse responses for near-duplicate inputs (temperature 0 only, opt-in)
+            semantic_threshold: Minimum cosine similarity for a semantic cache hit
+            embedding_model: Model used to embed inputs for the semantic cache
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
@@ -40,29 +57,148 @@ class MetadataExtractor:
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
+        self.use_cache = use_cache
+        self.semantic_cache = semantic_cache
+        self.semantic_threshold = semantic_threshold
+        self.embedding_model = embedding_model
+        self.embeddings = OrderedDict()
+        self.embeddings_lock = threading.Lock()
         
         # Rate limiting
         self.requests_per_minute = requests_per_minute
-        self.request_times = []
+        self.request_times = deque()
         self.rate_limit_lock = threading.Lock()
     
     def _rate_limit(self):
         """Simple rate limiter to respect API limits."""
         with self.rate_limit_lock:
             current_time = time.time()
-            # Remove requests older than 1 minute
-            self.request_times = [t for t in self.request_times if current_time - t < 60]
+            # Remove requests older than 1 minute (oldest are at the left)
+            while self.request_times and current_time - self.request_times[0] >= 60:
+                self.request_times.popleft()
             
             if len(self.request_times) >= self.requests_per_minute:
                 # Wait until we can make another request
                 sleep_time = 60 - (current_time - self.request_times[0])
                 if sleep_time > 0:
-                    logger.info(f"Rate limit reached, waiting {sleep_time:.1f} seconds")
+                    logger.info("Rate limit reached, waiting %.1f seconds", sleep_time)
                     time.sleep(sleep_time)
                     current_time = time.time()
             
             self.request_times.append(current_time)
 
+    def _cache_key(self, messages: list) -> str:
+        """Hash everything that determines the completion for a request."""
+        payload = json.dumps(
+            {
+                "model": self.model,
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                "messages": messages,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on miss or DB error."""
+        try:
+            pg_client = PostgresClient()
+            try:
+                row = pg_client.select_one(
+                    "SELECT response FROM pdf_library.llm_cache WHERE key = %s",
+                    (key,),
+                )
+            finally:
+                pg_client.close()
+        except Exception as e:
+            logger.warning("LLM cache lookup failed: %s", e)
+            return None
+        return row["response"] if row else None
+
+    def _cache_put(self, key: str, response: str):
+        """Store a parsed-OK response; concurrent writers of the same key are ignored."""
+        try:
+            pg_client = PostgresClient()
+            try:
+                pg_client.insert_row(
+                    "pdf_library",
+                    "llm_cache",
+                    {
+                        "key": key,
+                        "response": response,
+                        "created_at": datetime.datetime.now(),
+                    },
+                    on_conflict_do_nothing=True,
+                )
+            finally:
+                pg_client.close()
+        except Exception as e:
+            logger.warning("LLM cache store failed: %s", e)
+
+    def _embed(self, text: str, max_chars: int = 2048, max_cached: int = 256) -> Optional[List[float]]:
+        """Embed the start of the input text, reusing recent embeddings."""
+        text = text[:max_chars]
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self.embeddings_lock:
+            if key in self.embeddings:
+                self.embeddings.move_to_end(key)
+                return self.embeddings[key]
+        try:
+            # Embedding calls count against the same API rate limit
+            self._rate_limit()
+            response = self.client.embeddings.create(model=self.embedding_model, input=text)
+        except Exception as e:
+            logger.warning("Embedding request failed: %s", e)
+            return None
+        embedding = response.data[0].embedding
+        with self.embeddings_lock:
+            self.embeddings[key] = embedding
+            if len(self.embeddings) > max_cached:
+                self.embeddings.popitem(last=False)
+        return embedding
+
+    def _semcache_get(self, template_key: str, embedding: List[float]) -> Optional[str]:
+        """Return the response of the nearest cached input with the same template, if similar enough."""
+        vector = "[" + ",".join(map(str, embedding)) + "]"
+        try:
+            pg_client = PostgresClient()
+            try:
+                row = pg_client.select_one(
+                    "SELECT response::text AS response, embedding <=> %s::vector AS distance "
+                    "FROM pdf_library.llm_semcache WHERE template_key = %s "
+                    "ORDER BY embedding <=> %s::vector LIMIT 1",
+                    (vector, template_key, vector),
+                )
+            finally:
+                pg_client.close()
+        except Exception as e:
+            logger.warning("Semantic cache lookup failed: %s", e)
+            return None
+        if row and row["distance"] <= 1 - self.semantic_threshold:
+            return row["response"]
+        return None
+
+    def _semcache_put(self, template_key: str, embedding: List[float], response: str):
+        """Store an (embedding, response) pair for future near-duplicate inputs."""
+        try:
+            pg_client = PostgresClient()
+            try:
+                pg_client.insert_row(
+                    "pdf_library",
+                    "llm_semcache",
+                    {
+                        "template_key": template_key,
+                        "embedding": "[" + ",".join(map(str, embedding)) + "]",
+                        "response": response,
+                        "created_at": datetime.datetime.now(),
+                    },
+                )
+            finally:
+                pg_client.close()
+        except Exception as e:
+            logger.warning("Semantic cache store failed: %s", e)
+
     def extract(self, 
                 input_text: str, 
                 prompt: str,
@@ -87,48 +223,82 @@ class MetadataExtractor:
             prompt = ""
         if input_text is None:
             input_text = ""
-        prompt = str(prompt).format(input_text=str(input_text))
+        prompt_template = str(prompt)
+        prompt = prompt_template.format(input_text=str(input_text))
         start_time = time.time()
         status = "success"
         error_message = None
         metadata = None
         content = ""
+        prompt_tokens = None
+        completion_tokens = None
+        
+        messages = [
+            {"role": "system", "content": sys_prompt},
+            {"role": "user", "content": prompt},
+        ]
+        cache_key = self._cache_key(messages) if self.use_cache else None
+        # Near-duplicate inputs may only share a response when sampling is deterministic
+        template_key = None
+        if self.semantic_cache and self.temperature == 0:
+            template_key = self._cache_key([
+                {"role": "system", "content": sys_prompt},
+                {"role": "user", "content": prompt_template},
+            ])
+        embedding = None
         
         try:
-            # Apply rate limiting
-            self._rate_limit()
+            cached = self._cache_get(cache_key) if cache_key else None
+            if cached is not None:
+                status = "cache_hit"
+            elif template_key:
+                embedding = self._embed(str(input_text))
+                if embedding is not None:
+                    cached = self._semcache_get(template_key, embedding)
+                    if cached is not None:
+                        status = "semantic_cache_hit"
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": sys_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
-            content = response.choices[0].message.content
-            logger.info(f"Raw response: {content}")
-            if content is None:
-                content = ""
+            if cached is not None:
+                content = cached
             else:
-                content = content.strip()
-            
-            # Clean up markdown code blocks if present
-            if content.startswith("```json"):
-                content = content[7:]  # Remove ```json
-            if content.endswith("```"):
-                content = content[:-3]  # Remove ```
-            content = content.strip()
+                # Apply rate limiting
+                self._rate_limit()
+                
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                )
+                if response.usage is not None:
+                    prompt_tokens = response.usage.prompt_tokens
+                    completion_tokens = response.usage.completion_tokens
+                content = response.choices[0].message.content
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Raw response: %s", content)
+                if content is None:
+                    content = ""
+                
+                # Clean up markdown code blocks if present
+                m = _FENCE_RE.match(content)
+                if m:
+                    content = m.group(1).strip()
+                else:
+                    content = _LONE_FENCE_RE.sub("", content).strip()
             
-            metadata = json.loads(content)
+            metadata = orjson.loads(content)
+            # Only fresh responses are cached; a semantic hit belongs to another input
+            if cache_key and status == "success":
+                self._cache_put(cache_key, content)
+            if embedding is not None and status == "success":
+                self._semcache_put(template_key, embedding, content)
         except OpenAIError as e:
             logger.error("OpenAI API error: %s", e)
             status = "openai_error"
             error_message = str(e)
             metadata = {}
             content = ""
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error("Failed to parse JSON: %s\nRaw response:\n%s", e, content)
             status = "json_error"
             error_message = f"JSONDecodeError: {e}"
@@ -142,20 +312,20 @@ class MetadataExtractor:
         if responce_keys:
             for key in responce_keys:
                 metadata.setdefault(key, None)
-        pg_client = PostgresClient()
+        # Keep the log row small: hash the prompt and keep only a preview of the
+        # response, except for failures where the full text helps debugging
         log_data = {
             "sys_prompt": sys_prompt,
-            "prompt": prompt,
-            "response": content,
+            "prompt_hash": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "response_preview": content[:512],
+            "response_len": len(content),
+            "response_full": None if error_message is None else content,
             "status": status,
             "error_message": error_message,
             "duration_sec": duration,
             "timestamp": datetime.datetime.now(),
         }
-        try:
-            pg_client.insert_row("pdf_library", "extraction_logs", log_data)
-        except Exception as e:
-            logger.error("Failed to log extraction to DB: %s", e)
-        finally:
-            pg_client.close()
+        log_buffer.append("pdf_library", "extraction_logs", log_data)
         return metadata 
\ No newline at end of file
@@ -1,12 +1,76 @@
 import psycopg2
+import functools
+import io
 import os
+import json
+import logging
 from psycopg2 import sql, OperationalError, InterfaceError
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 import psycopg2.extras
+import psycopg2.pool
+import threading
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+_POOLS = {}
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(host, port, database, user, password):
+    """Lazily build one process-wide connection pool per set of connection parameters."""
+    key = (host, port, database, user, password)
+    pool = _POOLS.get(key)
+    if pool is None:
+        with _POOL_LOCK:
+            pool = _POOLS.get(key)
+            if pool is None:
+                pool = psycopg2.pool.ThreadedConnectionPool(
+                    1,
+                    16,
+                    host=host,
+                    port=port,
+                    dbname=database,
+                    user=user,
+                    password=password,
+                    sslmode="require"
+                )
+                _POOLS[key] = pool
+    return pool
+
+
+def _csv_value(value: Any) -> str:
+    """Render a Python value as a CSV field for COPY, using \\N for NULL."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (list, tuple)):
+        items = ",".join(
+            "NULL" if item is None
+            else '"' + str(item).replace("\\", "\\\\").replace('"', '\\"') + '"'
+            for item in value
+        )
+        value = "{" + items + "}"
+    elif isinstance(value, dict):
+        value = json.dumps(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+@functools.lru_cache(maxsize=64)
+def _build_insert(schema: str, table: str, columns: tuple, on_conflict_do_nothing: bool = False) -> sql.Composed:
+    """Compose (once per table and column set) the INSERT used by insert_row."""
+    query = sql.SQL("INSERT INTO {schema}.{table} ({fields}) VALUES ({placeholders})").format(
+        schema=sql.Identifier(schema),
+        table=sql.Identifier(table),
+        fields=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        placeholders=sql.SQL(", ").join(sql.Placeholder() * len(columns))
+    )
+    if on_conflict_do_nothing:
+        query = query + sql.SQL(" ON CONFLICT DO NOTHING")
+    return query
+
+
 class PostgresClient:
     def __init__(
         self,
@@ -22,14 +86,14 @@ class PostgresClient:
         self.user = user or os.getenv("POSTGRES_USER")
         self.password = password or os.getenv("POSTGRES_PASSWORD")
         
-        self.conn = psycopg2.connect(
-            host=self.host,
-            port=self.port,
-            dbname=self.database,
-            user=self.user,
-            password=self.password,
-            sslmode="require"
+        self.pool = _get_pool(
+            self.host,
+            self.port,
+            self.database,
+            self.user,
+            self.password
         )
+        self.conn = self.pool.getconn()
         self.conn.autocommit = True  # Optional: auto-commit inserts
 
     def check_connection(self, raise_on_error: bool = False) -> bool:
@@ -62,22 +126,19 @@ class PostgresClient:
         self,
         schema: str,
         table: str,
-        data: Dict[str, Any]
+        data: Dict[str, Any],
+        on_conflict_do_nothing: bool = False
     ):
         """
         Insert a single row into a table.
         :param table: Table name.
         :param data: Dict of column names to values.
+        :param on_conflict_do_nothing: Silently skip rows that violate a unique constraint.
         """
-        columns = list(data.keys())
+        columns = tuple(data.keys())
         values = list(data.values())
 
-        query = sql.SQL("INSERT INTO {schema}.{table} ({fields}) VALUES ({placeholders})").format(
-            schema=sql.Identifier(schema),
-            table=sql.Identifier(table),
-            fields=sql.SQL(", ").join(map(sql.Identifier, columns)),
-            placeholders=sql.SQL(", ").join(sql.Placeholder() * len(values))
-        )
+        query = _build_insert(schema, table, columns, on_conflict_do_nothing)
 
         with self.conn.cursor() as cur:
             cur.execute(query, values)
@@ -109,8 +170,47 @@ class PostgresClient:
             fields=sql.SQL(", ").join(map(sql.Identifier, columns))
         )
 
+        # Run all pages in one transaction so the batch commits (and flushes WAL) once
+        self.conn.autocommit = False
+        try:
+            with self.conn:
+                with self.conn.cursor() as cur:
+                    psycopg2.extras.execute_values(
+                        cur, query.as_string(cur), values, page_size=1000
+                    )
+        finally:
+            self.conn.autocommit = True
+
+    def copy_from_dicts(
+        self,
+        schema: str,
+        table: str,
+        data_list: List[Dict[str, Any]]
+    ):
+        """
+        Bulk-load rows into a table with COPY ... FROM STDIN.
+        :param schema: Schema name.
+        :param table: Table name.
+        :param data_list: List of dicts sharing the same keys.
+        """
+        if not data_list:
+            return
+
+        columns = list(data_list[0].keys())
+        buf = io.StringIO()
+        for d in data_list:
+            buf.write(",".join(_csv_value(d[col]) for col in columns))
+            buf.write("\n")
+        buf.seek(0)
+
+        query = sql.SQL("COPY {schema}.{table} ({fields}) FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(
+            schema=sql.Identifier(schema),
+            table=sql.Identifier(table),
+            fields=sql.SQL(", ").join(map(sql.Identifier, columns))
+        )
+
         with self.conn.cursor() as cur:
-            psycopg2.extras.execute_values(cur, query.as_string(cur), values)
+            cur.copy_expert(query.as_string(cur), buf)
 
     def select_all(self, query: str) -> List[Dict[str, Any]]:
         if query:
@@ -121,5 +221,106 @@ class PostgresClient:
         else:
             raise ValueError("No query provided")   
 
+    def select_one(self, query: str, params=None) -> Optional[Dict[str, Any]]:
+        """
+        Run a parameterized query and return the first row, or None.
+        :param query: SQL query with %s placeholders.
+        :param params: Query parameters.
+        """
+        if not query:
+            raise ValueError("No query provided")
+        with self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(query, params)
+            row = cur.fetchone()
+        return dict(row) if row else None
+
     def close(self):
-        self.conn.close() 
\ No newline at end of file
+        """Return the connection to the shared pool."""
+        if self.conn is not None:
+            self.pool.putconn(self.conn)
+            self.conn = None 
+
+
+class LogBuffer:
+    """
+    Thread-safe buffer for log rows that are written to PostgreSQL in batches.
+
+    Rows are flushed by a background thread every `flush_interval` seconds, or
+    sooner once `batch_size` rows are pending. Call `close()` on shutdown to
+    stop the thread and write whatever is left.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows = []
+        self.lock = threading.Lock()
+        # Serializes flushes, so a flush returns only after any in-flight batch is written
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def append(self, schema: str, table: str, data: Dict[str, Any]):
+        """
+        Queue a single row for insertion.
+        :param schema: Schema name.
+        :param table: Table name.
+        :param data: Dict of column names to values.
+        """
+        with self.lock:
+            self.rows.append((schema, table, data))
+            pending = len(self.rows)
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name="log-buffer-flush", daemon=True
+                )
+                self.thread.start()
+        if pending >= self.batch_size:
+            self.wakeup.set()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background thread, wait for it, and write the remaining rows."""
+        self.stopped.set()
+        self.wakeup.set()
+        with self.lock:
+            thread = self.thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def flush(self):
+        """Write all pending rows, one COPY per table and column set."""
+        with self.flush_lock:
+            with self.lock:
+                rows, self.rows = self.rows, []
+            if rows:
+                self._write(rows)
+
+    def _write(self, rows: list):
+        groups = {}
+        for schema, table, data in rows:
+            groups.setdefault((schema, table, tuple(data)), []).append(data)
+
+        try:
+            pg_client = PostgresClient()
+        except Exception as e:
+            logger.error("Failed to flush %d log rows to DB: %s", len(rows), e)
+            return
+        try:
+            for (schema, table, _), data_list in groups.items():
+                try:
+                    pg_client.copy_from_dicts(schema, table, data_list)
+                except Exception as e:
+                    logger.error("Failed to flush %d rows to %s.%s: %s", len(data_list), schema, table, e)
+        finally:
+            pg_client.close()
+
+
+log_buffer = LogBuffer()
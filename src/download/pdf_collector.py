@@ -1,48 +1,142 @@
 import os
+import json
 import time
+import math
+import hashlib
+import threading
 import requests
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from tqdm import tqdm
 
-def collect_pdf_urls(api_url: str = None, max_pdfs: int = 1000):
+def _make_throttle(requests_per_second: float):
+    """Return a thread-safe callable that spaces calls at most `requests_per_second` apart."""
+    lock = threading.Lock()
+    interval = 1.0 / requests_per_second
+    next_slot = [0.0]
+
+    def wait():
+        with lock:
+            now = time.monotonic()
+            slot = max(now, next_slot[0])
+            next_slot[0] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    return wait
+
+def _per_page(api_url: str) -> int:
+    """Results per page requested by the URL (OpenAlex defaults to 25)."""
+    values = parse_qs(urlparse(api_url).query).get("per_page", [])
+    return int(values[0]) if values and values[0].isdigit() else 25
+
+def _fetch_page(page: int, session: requests.Session, api_url: str, throttle) -> list:
+    """Fetch one OpenAlex results page."""
+    throttle()
+    r = session.get(api_url.format(page=page), headers={"User-Agent": "PDF-harvester/1.0"}, timeout=30)
+    r.raise_for_status()
+    return r.json().get("results", [])
+
+def _read_url_cache(cache_file: Path, max_pdfs: int, ttl: float) -> Optional[list]:
+    """Return cached URLs if the file is fresh and holds enough of them."""
+    try:
+        if time.time() - cache_file.stat().st_mtime >= ttl:
+            return None
+        cached = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    urls = cached.get("urls", [])
+    # A short list is still complete if the source ran out before the old limit
+    if cached.get("max_pdfs", 0) >= max_pdfs or len(urls) < cached.get("max_pdfs", 0):
+        return urls[:max_pdfs]
+    return None
+
+def _write_url_cache(cache_file: Path, max_pdfs: int, urls: list):
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix(".tmp")
+    tmp_file.write_text(json.dumps({"max_pdfs": max_pdfs, "urls": urls}), encoding="utf-8")
+    os.replace(tmp_file, cache_file)
+
+def collect_pdf_urls(
+    api_url: str = None,
+    max_pdfs: int = 1000,
+    max_workers: int = 10,
+    requests_per_second: float = 10,
+    cache_dir: Optional[Path] = Path("data/cache"),
+    cache_ttl: float = 24 * 60 * 60
+):
     """
     Collect PDF URLs from OpenAlex API with pagination.
-    
+
+    Pages are fetched concurrently in blocks of up to `max_workers` over a shared
+    keep-alive session, throttled to the OpenAlex rate limit. Results are
+    cached on disk per `api_url` for `cache_ttl` seconds.
+
     Args:
         api_url: Custom API URL (optional)
         max_pdfs: Maximum number of PDFs to collect
-    
+        max_workers: Number of pages fetched concurrently
+        requests_per_second: Request rate cap (OpenAlex limit is 10 req/s)
+        cache_dir: Directory for cached URL lists (None disables caching)
+        cache_ttl: Maximum age of a cached URL list in seconds
+
     Returns:
         List of PDF URLs
     """
     if api_url is None:
         api_url = "https://api.openalex.org/works?filter=concept.id:C121332964,has_pmid:true,primary_location.source.type:journal,publication_year:2022-2025&per_page=200&page={page}"
-    
+
+    cache_file = None
+    if cache_dir is not None:
+        key = hashlib.sha1(api_url.encode("utf-8")).hexdigest()
+        cache_file = Path(cache_dir) / f"urls_{key}.json"
+        cached = _read_url_cache(cache_file, max_pdfs, cache_ttl)
+        if cached is not None:
+            return cached
+
     pdf_urls = []
+    seen = set()
     page = 1
+    done = False
+    per_page = _per_page(api_url)
+    throttle = _make_throttle(requests_per_second)
     pbar = tqdm(desc="Searching for articles", unit="work")
-    
-    while len(pdf_urls) < max_pdfs:
-        url = api_url.format(page=page)
-        r = requests.get(url, headers={"User-Agent": "PDF-harvester/1.0"}, timeout=30)
-        r.raise_for_status()
-        payload = r.json()
-        batch = 0
-        
-        for work in payload.get("results", []):
-            loc = work.get("best_oa_location") or {}
-            pdf = loc.get("pdf_url")
-            if pdf and pdf not in pdf_urls:
-                pdf_urls.append(pdf)
-                batch += 1
+
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fetch = partial(_fetch_page, session=session, api_url=api_url, throttle=throttle)
+
+        while not done and len(pdf_urls) < max_pdfs:
+            # Don't request more pages than the remaining URLs could fill
+            block = max(1, min(max_workers, math.ceil((max_pdfs - len(pdf_urls)) / per_page)))
+            # Results come back in page order, so merging matches sequential paging
+            for works in executor.map(fetch, range(page, page + block)):
+                batch = 0
+
+                for work in works:
+                    loc = work.get("best_oa_location") or {}
+                    pdf = loc.get("pdf_url")
+                    if pdf and pdf not in seen:
+                        seen.add(pdf)
+                        pdf_urls.append(pdf)
+                        batch += 1
+                        if len(pdf_urls) >= max_pdfs:
+                            break
+
+                if batch == 0:  # Empty page → no point continuing
+                    done = True
+                    break
+
+                pbar.update(batch)
                 if len(pdf_urls) >= max_pdfs:
                     break
-        
-        if batch == 0:  # Empty page → no point continuing
-            break
-            
-        page += 1
-        pbar.update(batch)
-        time.sleep(0.2)  # ≤ 5 req/s (OpenAlex limit is 10 req/s)
-    
+
+            page += block
+
     pbar.close()
-    return pdf_urls[:max_pdfs] 
\ No newline at end of file
+    pdf_urls = pdf_urls[:max_pdfs]
+    if cache_file is not None:
+        _write_url_cache(cache_file, max_pdfs, pdf_urls)
+    return pdf_urls
@@ -1,16 +1,25 @@
 import os
+import shutil
+import hashlib
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 import time
 import logging
 import random
 from pathlib import Path
 from urllib.parse import urlparse, unquote
 from typing import Optional
-from database.postgres_client import PostgresClient
+from database.postgres_client import log_buffer
 import datetime
 
 logger = logging.getLogger(__name__)
 
+# Shared keep-alive session: one TLS handshake per host instead of per download
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0))
+
 def get_random_user_agent():
     """Get a random user agent to avoid detection."""
     user_agents = [
@@ -49,6 +58,7 @@ def download_pdf(
     status = "success"
     error_message = None
     file_path = None
+    response = None
     retry_count = 0
     
     try:
@@ -59,9 +69,10 @@ def download_pdf(
         parsed_url = urlparse(url)
         filename = unquote(parsed_url.path.split('/')[-1])
         
-        # If no filename or empty, generate one from URL
+        # If no filename or empty (e.g. ".../pdf"), derive a stable, unique one
+        # from the URL so concurrent downloads never share a path
         if not filename or '.' not in filename:
-            filename = f"downloaded_{int(time.time())}.pdf"
+            filename = f"downloaded_{hashlib.sha1(url.encode('utf-8')).hexdigest()}.pdf"
         
         # Ensure .pdf extension
         if not filename.lower().endswith('.pdf'):
@@ -71,7 +82,7 @@ def download_pdf(
         
         # Check if file already exists
         if file_path.exists():
-            logger.info(f"File already exists: {file_path}")
+            logger.info("File already exists: %s", file_path)
             status = "already_exists"
             return str(file_path)
         
@@ -86,10 +97,35 @@ def download_pdf(
             "Referer": parsed_url.scheme + "://" + parsed_url.netloc,
         }
         
+        # Probe with HEAD first so oversized files and HTML landing pages are
+        # skipped without downloading the body. Servers that reject HEAD or
+        # omit the headers fall through to the GET below.
+        try:
+            head = _SESSION.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+            head.close()
+            if head.status_code == 200:
+                head_length = head.headers.get('content-length', '')
+                if head_length.isdigit():
+                    file_size_mb = int(head_length) / (1024 * 1024)
+                    if file_size_mb > max_mb:
+                        error_message = f"File too large: {file_size_mb:.1f}MB > {max_mb}MB"
+                        logger.error(error_message)
+                        status = "file_too_large"
+                        return None
+                
+                head_type = head.headers.get('content-type', '').lower()
+                if 'text/html' in head_type:
+                    error_message = f"Not a PDF: Content-Type is {head_type}"
+                    logger.warning("Skipping %s: Content-Type is %s, not PDF", url, head_type)
+                    status = "not_pdf"
+                    return None
+        except requests.exceptions.RequestException as e:
+            logger.debug("HEAD request failed for %s: %s", url, e)
+        
         # Retry logic for failed downloads
         while retry_count < max_retries:
             try:
-                response = requests.get(
+                response = _SESSION.get(
                     url, 
                     headers=headers, 
                     timeout=timeout, 
@@ -100,9 +136,12 @@ def download_pdf(
                 # Handle different HTTP status codes
                 if response.status_code == 200:
                     break
-                elif response.status_code == 403:
+                
+                # Hand the connection back to the session pool before retrying
+                response.close()
+                if response.status_code == 403:
                     error_message = f"Access forbidden (403) - URL may require authentication or be blocked"
-                    logger.warning(f"403 Forbidden for {url} - attempt {retry_count + 1}/{max_retries}")
+                    logger.warning("403 Forbidden for %s - attempt %s/%s", url, retry_count + 1, max_retries)
                     status = "access_forbidden"
                     if retry_count < max_retries - 1:
                         time.sleep(retry_delay * (retry_count + 1))  # Exponential backoff
@@ -112,12 +151,12 @@ def download_pdf(
                         return None
                 elif response.status_code == 404:
                     error_message = f"File not found (404)"
-                    logger.error(f"404 Not Found for {url}")
+                    logger.error("404 Not Found for %s", url)
                     status = "not_found"
                     return None
                 elif response.status_code == 429:
                     error_message = f"Rate limited (429) - too many requests"
-                    logger.warning(f"Rate limited for {url} - attempt {retry_count + 1}/{max_retries}")
+                    logger.warning("Rate limited for %s - attempt %s/%s", url, retry_count + 1, max_retries)
                     status = "rate_limited"
                     if retry_count < max_retries - 1:
                         time.sleep(retry_delay * (retry_count + 1) * 2)  # Longer delay for rate limiting
@@ -131,7 +170,7 @@ def download_pdf(
             except requests.exceptions.RequestException as e:
                 retry_count += 1
                 if retry_count < max_retries:
-                    logger.warning(f"Download attempt {retry_count} failed for {url}: {e}")
+                    logger.warning("Download attempt %s failed for %s: %s", retry_count, url, e)
                     time.sleep(retry_delay * retry_count)
                     continue
                 else:
@@ -139,7 +178,7 @@ def download_pdf(
         
         content_type = response.headers.get('content-type', '').lower()
         if 'pdf' not in content_type and not filename.lower().endswith('.pdf'):
-            logger.warning(f"Warning: Content-Type is {content_type}, not PDF")
+            logger.warning("Warning: Content-Type is %s, not PDF", content_type)
         
         content_length = response.headers.get('content-length')
         if content_length:
@@ -150,24 +189,36 @@ def download_pdf(
                 status = "file_too_large"
                 return None
         
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        # Copy the body in 1MB chunks inside shutil's C-level loop. Write to a
+        # temporary file first so an interrupted download never leaves a
+        # truncated PDF at file_path to be reused as "already_exists".
+        response.raw.decode_content = True
+        tmp_path = file_path.with_name(file_path.name + ".part")
+        try:
+            with open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
         
-        logger.info(f"Downloaded: {file_path}")
+        logger.info("Downloaded: %s", file_path)
         return str(file_path)
         
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as e:
+        # Reading response.raw raises urllib3 errors rather than requests ones
         error_message = f"Download failed: {str(e)}"
-        logger.error(f"Download failed for {url}: {e}")
+        logger.error("Download failed for %s: %s", url, e)
         status = "request_error"
         return None
     except Exception as e:
         error_message = f"Unexpected error: {str(e)}"
-        logger.error(f"Unexpected error downloading {url}: {e}")
+        logger.error("Unexpected error downloading %s: %s", url, e)
         status = "unexpected_error"
         return None
     finally:
+        if response is not None:
+            response.close()
         duration = time.time() - start_time
         log_data = {
             "url": url,
@@ -177,13 +228,4 @@ def download_pdf(
             "duration_sec": duration,
             "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
         }
-        
-        try:
-            pg_client = PostgresClient()
-            pg_client.insert_row("pdf_library", "download_logs", log_data)
-            logger.debug(f"Download log saved to database for {url}")
-        except Exception as e:
-            logger.error(f"Failed to log download to DB: {e}")
-        finally:
-            if 'pg_client' in locals():
-                pg_client.close() 
\ No newline at end of file
+        log_buffer.append("pdf_library", "download_logs", log_data) 
\ No newline at end of file
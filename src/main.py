@@ -3,90 +3,198 @@ from utils.yaml_utils import read_yaml
 from parsers.pdf_parser import first_n_pages_to_text
 from pathlib import Path
 from download.pdf_downloader import download_pdf
-from database.postgres_client import PostgresClient
+from database.postgres_client import PostgresClient, log_buffer
 from logging import getLogger
 from download.pdf_collector import collect_pdf_urls
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import asyncio
+import multiprocessing
+import os
 
 logger = getLogger(__name__)
 
-# Thread-local storage for database connections
-thread_local = threading.local()
+# Concurrency per pipeline stage
+DOWNLOAD_WORKERS = 32
+PARSE_WORKERS = os.cpu_count() or 1
+LLM_WORKERS = 8
 
-def get_postgres_client():
-    """Get thread-local PostgreSQL client."""
-    if not hasattr(thread_local, 'postgres_client'):
-        thread_local.postgres_client = PostgresClient()
-    return thread_local.postgres_client
+def make_parser_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for PDF parsing, which is CPU-bound and would serialize on the GIL.
+
+    Workers start from a forkserver (or spawn where that is unavailable), not
+    fork(): they are created while download threads, the log flusher and pooled
+    SSL connections are live, and a forked child could inherit one of their
+    locks held.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=PARSE_WORKERS,
+        mp_context=multiprocessing.get_context(method)
+    )
+
+async def download_stage(dl_q, parse_q, raw_dir, executor):
+    """Download PDFs and hand their paths to the parse stage."""
+    loop = asyncio.get_running_loop()
+    while True:
+        pdf_link = await dl_q.get()
+        try:
+            pdf_path = await loop.run_in_executor(
+                executor, partial(download_pdf, pdf_link, raw_dir, max_mb=20)
+            )
+            if pdf_path is None:
+                logger.warning("Failed to download: %s", pdf_link)
+            else:
+                await parse_q.put((pdf_link, pdf_path))
+        except Exception as e:
+            logger.error("Error downloading %s: %s", pdf_link, e)
+        finally:
+            dl_q.task_done()
+
+async def parse_stage(parse_q, llm_q, parser):
+    """
+    Extract text from downloaded PDFs in worker processes.
+
+    `parser['pool']` is shared by all parse workers. If a worker process dies
+    (e.g. PDFium crashes on a malformed file) the pool is broken for every
+    pending call, so it is replaced and the PDF is retried once.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        pdf_link, pdf_path = await parse_q.get()
+        try:
+            for attempt in range(2):
+                pool = parser['pool']
+                try:
+                    text = await loop.run_in_executor(pool, first_n_pages_to_text, Path(pdf_path))
+                    break
+                except BrokenProcessPool:
+                    if attempt:
+                        raise
+                    logger.warning("Parser process died while parsing %s; restarting the pool and retrying", pdf_link)
+                    # Only the first worker to notice replaces the pool
+                    if parser['pool'] is pool:
+                        parser['pool'] = make_parser_pool()
+                        parser['restarts'] += 1
+                        pool.shutdown(wait=False)
+            await llm_q.put((pdf_link, pdf_path, text))
+        except BrokenProcessPool:
+            logger.error("Parser process died twice while parsing %s; skipping it", pdf_link)
+            parser['failed'] += 1
+        except Exception as e:
+            logger.error("Error parsing %s: %s", pdf_link, e)
+        finally:
+            parse_q.task_done()
+
+async def llm_stage(llm_q, db_q, extractor, config, executor):
+    """Extract metadata from PDF text with the shared (rate-limited) extractor."""
+    loop = asyncio.get_running_loop()
+    prompt = config['prompts']['user_prompt_template']
+    sys_prompt = config['prompts']['sys_prompt']
+    responce_keys = config['prompts']['responce_keys']
+    while True:
+        pdf_link, pdf_path, text = await llm_q.get()
+        try:
+            data = await loop.run_in_executor(
+                executor,
+                partial(
+                    extractor.extract,
+                    input_text=text,
+                    prompt=prompt,
+                    sys_prompt=sys_prompt,
+                    responce_keys=responce_keys
+                )
+            )
+            data['pdf_path'] = str(pdf_path)
+            await db_q.put((pdf_link, data))
+        except Exception as e:
+            logger.error("Error extracting metadata for %s: %s", pdf_link, e)
+        finally:
+            llm_q.task_done()
+
+async def db_stage(db_q, postgres_client, executor, progress):
+    """Save extracted metadata to the database."""
+    loop = asyncio.get_running_loop()
+    while True:
+        pdf_link, data = await db_q.get()
+        try:
+            await loop.run_in_executor(
+                executor,
+                postgres_client.insert_row, "pdf_library", "pdf_metadata", data
+            )
+            progress['processed'] += 1
+            logger.info("Processed: %s", pdf_link)
+            print(f"Completed {progress['processed']}/{progress['total']}: {pdf_link}")
+        except Exception as e:
+            logger.error("Error saving %s: %s", pdf_link, e)
+        finally:
+            db_q.task_done()
+
+async def run_pipeline(pdf_links, raw_dir, config, extractor) -> int:
+    """
+    Process PDFs through staged queues: download -> parse -> LLM -> DB.
+
+    Each stage has its own workers, so a slow stage only limits throughput to
+    its own concurrency. All LLM workers share `extractor`, and with it one
+    OpenAI client and rate limiter. Returns the number of PDFs saved to the
+    database.
+    """
+    dl_q, parse_q, llm_q, db_q = (asyncio.Queue() for _ in range(4))
+    for pdf_link in pdf_links:
+        dl_q.put_nowait(pdf_link)
+
+    postgres_client = PostgresClient()
+    progress = {'processed': 0, 'total': len(pdf_links)}
+
+    download_pool = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+    llm_pool = ThreadPoolExecutor(max_workers=LLM_WORKERS)
+    db_pool = ThreadPoolExecutor(max_workers=1)
+    parser = {'pool': make_parser_pool(), 'restarts': 0, 'failed': 0}
+
+    stages = [
+        (dl_q, [download_stage(dl_q, parse_q, raw_dir, download_pool) for _ in range(DOWNLOAD_WORKERS)]),
+        (parse_q, [parse_stage(parse_q, llm_q, parser) for _ in range(PARSE_WORKERS)]),
+        (llm_q, [llm_stage(llm_q, db_q, extractor, config, llm_pool) for _ in range(LLM_WORKERS)]),
+        (db_q, [db_stage(db_q, postgres_client, db_pool, progress)]),
+    ]
+    tasks = [[asyncio.create_task(worker) for worker in workers] for _, workers in stages]
 
-def process_pdf(pdf_link, raw_dir, config):
-    """Process a single PDF: download, parse, extract metadata, and save to DB."""
     try:
-        # Download PDF
-        pdf_path = download_pdf(pdf_link, raw_dir, max_mb=20)
-        if pdf_path is None:
-            logger.warning(f"Failed to download: {pdf_link}")
-            return None
-        
-        # Parse PDF text
-        text = first_n_pages_to_text(Path(pdf_path))
-        
-        # Extract metadata
-        metadata_extractor = MetadataExtractor()
-        prompt = config['prompts']['user_prompt_template']
-        sys_prompt = config['prompts']['sys_prompt']
-        responce_keys = config['prompts']['responce_keys']
-        
-        data = metadata_extractor.extract(
-            input_text=text, 
-            prompt=prompt, 
-            sys_prompt=sys_prompt,
-            responce_keys=responce_keys
+        # Drain stages in order; a stage is finished once its queue is empty
+        # and every upstream stage has stopped producing.
+        for (queue, _), stage_tasks in zip(stages, tasks):
+            await queue.join()
+            for task in stage_tasks:
+                task.cancel()
+            await asyncio.gather(*stage_tasks, return_exceptions=True)
+    finally:
+        for pool in (download_pool, parser['pool'], llm_pool, db_pool):
+            pool.shutdown(wait=True)
+        postgres_client.close()
+
+    if parser['restarts']:
+        logger.error(
+            "Parser pool crashed %d time(s); %d PDF(s) could not be parsed",
+            parser['restarts'], parser['failed']
         )
-        data['pdf_path'] = str(pdf_path)
-        
-        # Save to database
-        postgres_client = get_postgres_client()
-        postgres_client.insert_row("pdf_library", "pdf_metadata", data)
-        
-        logger.info(f"Processed: {pdf_link}")
-        return data
-        
-    except Exception as e:
-        logger.error(f"Error processing {pdf_link}: {e}")
-        return None
+
+    return progress['processed']
 
 if __name__ == "__main__":
     config = read_yaml()
+    # Build the extractor (and its OpenAI client) once, before collecting URLs,
+    # so a missing API key fails fast
+    extractor = MetadataExtractor()
     api_url = config['pdf_search']['api_url']
     pdf_links = collect_pdf_urls(api_url=api_url, max_pdfs=2000)
     raw_dir = Path("data/raw")
-    
-    # Use ThreadPoolExecutor for concurrent processing
-    max_workers = 2
-    processed_count = 0
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_link = {
-            executor.submit(process_pdf, pdf_link, raw_dir, config): pdf_link 
-            for pdf_link in pdf_links
-        }
-        
-        # Process completed tasks
-        for future in as_completed(future_to_link):
-            pdf_link = future_to_link[future]
-            try:
-                result = future.result()
-                if result:
-                    processed_count += 1
-                    print(f"Completed {processed_count}/{len(pdf_links)}: {pdf_link}")
-            except Exception as e:
-                logger.error(f"Task failed for {pdf_link}: {e}")
-    
-    # Clean up thread-local database connections
-    if hasattr(thread_local, 'postgres_client'):
-        thread_local.postgres_client.close()
-    
-    print(f"Processing complete. Successfully processed {processed_count}/{len(pdf_links)} PDFs.")
\ No newline at end of file
+
+    try:
+        processed_count = asyncio.run(run_pipeline(pdf_links, raw_dir, config, extractor))
+    finally:
+        # Stop the log flusher and write any buffered download/extraction logs
+        log_buffer.close()
+
+    print(f"Processing complete. Successfully processed {processed_count}/{len(pdf_links)} PDFs.")
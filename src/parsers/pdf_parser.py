@@ -1,28 +1,73 @@
-import PyPDF2
+import os
+import hashlib
+import pypdfium2 as pdfium
 from pathlib import Path
 from typing import Optional
 
+TEXT_CACHE_DIR = Path("data/cache/text")
+
+def _fingerprint(pdf_path: Path) -> str:
+    """Cheap file fingerprint: hash of the first 64KB plus the file size."""
+    with open(pdf_path, 'rb') as file:
+        head = file.read(65536)
+    return hashlib.sha1(head + str(pdf_path.stat().st_size).encode()).hexdigest()
+
 def extract_text_from_pdf(pdf_path: Path, max_pages: int = 5) -> Optional[str]:
     """
-    Extract text from the first N pages of a PDF file.
+    Extract text from the first N pages of a PDF file, reusing the cached
+    text from a previous run when the file is unchanged.
     
     Args:
         pdf_path: Path to the PDF file
         max_pages: Maximum number of pages to extract (default: 5)
     
+    Returns:
+        Extracted text as string, or None if extraction fails
+    """
+    cache_file = None
+    try:
+        cache_file = TEXT_CACHE_DIR / f"{_fingerprint(Path(pdf_path))}_{max_pages}.txt"
+        return cache_file.read_text(encoding="utf-8")
+    except OSError:
+        pass
+    
+    text = _extract_text(pdf_path, max_pages)
+    if text is not None and cache_file is not None:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_text(text, encoding="utf-8")
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"Error caching text for {pdf_path}: {e}")
+    return text
+
+def _extract_text(pdf_path: Path, max_pages: int) -> Optional[str]:
+    """
+    Extract text from the first N pages of a PDF file with PDFium.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        max_pages: Maximum number of pages to extract
+    
     Returns:
         Extracted text as string, or None if extraction fails
     """
     try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            pages = []
             
-            for page_num in range(min(len(pdf_reader.pages), max_pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
+            for page_num in range(min(len(pdf), max_pages)):
+                page = pdf[page_num]
+                textpage = page.get_textpage()
+                pages.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
             
-            return text.strip()
+            return "\n".join(pages).strip()
+        finally:
+            pdf.close()
             
     except Exception as e:
         print(f"Error extracting text from {pdf_path}: {e}")
@@ -1,10 +1,16 @@
 import os
 import yaml
 
+try:
+    # libyaml-backed loader, much faster than the pure-Python one
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 def read_yaml(file_path='config.yaml'):
     """Load YAML file into a dictionary."""
     if not os.path.isfile(file_path):
         raise FileNotFoundError(f"YAML file not found: {file_path}")
 
     with open(file_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=SafeLoader)
\ No newline at end of file